@@ -0,0 +1,71 @@
+from __future__ import annotations
+import os
+from pathlib import Path
+from typing import Optional
+from watchdog.events import FileSystemEventHandler, FileSystemEvent
+from watchdog.observers import Observer
+from .db import _guess_kind, _guess_star_from_path, upsert_artifact, delete_artifact_path
+from .workbench import invalidate_negative_cache
+
+WATCH_ENABLED = os.environ.get("ARTIFACT_WATCH", "true").lower() in ("1","true","yes","on")
+WATCH_RUN_ID = "watch"
+
+class _IndexHandler(FileSystemEventHandler):
+    """Upsert artifacts into the DB index as files land, so workbench lookups stay warm."""
+
+    def _index(self, path: str):
+        kind = _guess_kind(path)
+        if not kind: return
+        star = _guess_star_from_path(path)
+        if not star: return
+        try:
+            st = os.stat(path)
+            upsert_artifact(WATCH_RUN_ID, star, kind, path, st.st_size, st.st_mtime)
+            invalidate_negative_cache(star)
+        except Exception:
+            pass
+
+    # index once a writer closes the file (IN_CLOSE_WRITE), not on every chunk it writes:
+    # per-write events would race request handlers for the DB lock and see half-written files
+    def on_closed(self, event: FileSystemEvent):
+        if not event.is_directory: self._index(event.src_path)
+
+    def _forget(self, path: str):
+        try:
+            delete_artifact_path(path)
+        except Exception:
+            pass
+
+    def on_moved(self, event: FileSystemEvent):
+        if not event.is_directory:
+            self._forget(event.src_path)
+            self._index(event.dest_path)
+
+    def on_deleted(self, event: FileSystemEvent):
+        if not event.is_directory: self._forget(event.src_path)
+
+_observer: Optional[Observer] = None
+
+def start_watcher(root: Path)->bool:
+    """Watch root recursively (inotify on Linux). Returns False if disabled or root is missing.
+
+    Close events are inotify-only; on other platforms only renames are indexed here and
+    _targeted_scan picks up the rest on first lookup.
+    """
+    global _observer
+    if not WATCH_ENABLED or _observer is not None or not root.exists():
+        return False
+    obs = Observer()
+    # root is recursive and covers every _targeted_scan sub-root
+    obs.schedule(_IndexHandler(), str(root), recursive=True)
+    obs.daemon = True
+    obs.start()
+    _observer = obs
+    return True
+
+def stop_watcher():
+    global _observer
+    if _observer is None: return
+    _observer.stop()
+    _observer.join(timeout=5)
+    _observer = None
@@ -23,8 +23,13 @@ def init_db():
             params TEXT, artifacts_dir TEXT,
             attempts INTEGER, max_retries INTEGER,
             log_path TEXT, pid INTEGER,
-            note TEXT, error TEXT
+            note TEXT, error TEXT,
+            info_json TEXT
         )""")
+        # databases created before info_json existed
+        cols = {r[1] for r in con.execute("PRAGMA table_info(jobs)")}
+        if "info_json" not in cols:
+            con.execute("ALTER TABLE jobs ADD COLUMN info_json TEXT")
         con.execute("""CREATE TABLE IF NOT EXISTS metrics(
             run_id TEXT PRIMARY KEY,
             n INTEGER, n_pos INTEGER,
@@ -67,30 +72,47 @@ def init_db():
             created_at REAL
         )""")
         con.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_star_kind ON artifacts(star, kind)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_path ON artifacts(path)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_candidates_p_final ON candidates(p_final DESC)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at DESC)")
     con.close()
 
-def upsert_job(j: Dict):
+def upsert_job(j: Dict, info_json: str|None=None):
     con = _conn()
     with con:
-        con.execute("""INSERT INTO jobs(job_id,job_type,state,created_at,started_at,finished_at,params,artifacts_dir,attempts,max_retries,log_path,pid,note,error)
-                       VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?)
+        con.execute("""INSERT INTO jobs(job_id,job_type,state,created_at,started_at,finished_at,params,artifacts_dir,attempts,max_retries,log_path,pid,note,error,info_json)
+                       VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)
                        ON CONFLICT(job_id) DO UPDATE SET
                          job_type=excluded.job_type, state=excluded.state,
                          created_at=excluded.created_at, started_at=excluded.started_at, finished_at=excluded.finished_at,
                          params=excluded.params, artifacts_dir=excluded.artifacts_dir,
                          attempts=excluded.attempts, max_retries=excluded.max_retries,
                          log_path=excluded.log_path, pid=excluded.pid,
-                         note=excluded.note, error=excluded.error
+                         note=excluded.note, error=excluded.error,
+                         info_json=excluded.info_json
         """, (
             j["job_id"], j["job_type"], j["state"],
             j.get("created_at"), j.get("started_at"), j.get("finished_at"),
             json.dumps(j.get("params") or {}), j.get("artifacts_dir"),
             j.get("attempts",0), j.get("max_retries",1),
             j.get("log_path"), j.get("pid"),
-            j.get("note"), j.get("error")
+            j.get("note"), j.get("error"), info_json
         ))
     con.close()
 
+def get_job_json(job_id: str)->Optional[str]:
+    con=_conn()
+    r=con.execute("SELECT info_json FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+    con.close()
+    return r[0] if r else None
+
+def list_job_json()->List[Tuple[str, Optional[str]]]:
+    con=_conn()
+    cur=con.execute("SELECT job_id, info_json FROM jobs ORDER BY created_at DESC")
+    out=cur.fetchall()
+    con.close()
+    return out
+
 def list_incomplete_jobs()->List[str]:
     con=_conn()
     cur=con.execute("SELECT job_id FROM jobs WHERE state IN ('queued','running')")
@@ -98,6 +120,13 @@ def list_incomplete_jobs()->List[str]:
     con.close()
     return out
 
+def list_running_jobs()->List[str]:
+    con=_conn()
+    cur=con.execute("SELECT job_id FROM jobs WHERE state='running'")
+    out=[r[0] for r in cur.fetchall()]
+    con.close()
+    return out
+
 def ingest_metrics(run_id: str, summary: Dict):
     con=_conn()
     with con:
@@ -222,8 +251,12 @@ def _guess_star_from_path(p: str)->str|None:
     m = STAR_PAT.search(os.path.basename(p))
     return (m.group(1).upper() if m else None)
 
+# in-flight writes (atomic tmp + rename) and workbench parquet sidecars are never artifacts
+_NON_ARTIFACT_SUFFIXES = (".tmp", ".parquet")
+
 def _guess_kind(p: str)->str|None:
     name = os.path.basename(p).lower()
+    if name.endswith(_NON_ARTIFACT_SUFFIXES): return None
     if "odd" in name and "even" in name: return "odd_even"
     if "centroid" in name: return "centroid"
     if "phase" in name: return "phase"
@@ -243,19 +276,41 @@ def upsert_artifact(run_id: str, star: str, kind: str, path: str, size:int, mtim
                     (run_id, star, kind, path, size, mtime, time.time()))
     con.close()
 
+def delete_artifact_path(path: str)->int:
+    con=_conn()
+    with con:
+        n = con.execute("DELETE FROM artifacts WHERE path=?", (path,)).rowcount
+    con.close()
+    return n
+
 from pathlib import Path
-def bulk_index_dir(run_id: str, root: Path, star_hint: str|None=None)->int:
+def _iter_files(root: str, skip: set):
+    """Recursive os.scandir walk yielding file DirEntry objects; dirs in skip are pruned."""
+    stack=[root]
+    while stack:
+        d = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    if e.is_dir(follow_symlinks=False):
+                        if e.path not in skip: stack.append(e.path)
+                    elif e.is_file():
+                        yield e
+        except OSError:
+            continue
+
+def bulk_index_dir(run_id: str, root: Path, star_hint: str|None=None, exclude=())->int:
     if not root.exists(): return 0
+    skip = {str(p) for p in exclude}
     cnt=0
-    for p in root.rglob("*"):
-        if not p.is_file(): continue
-        kind = _guess_kind(p.name)
+    for e in _iter_files(str(root), skip):
+        kind = _guess_kind(e.name)
         if not kind: continue
-        star = (star_hint or _guess_star_from_path(str(p)))
+        star = (star_hint or _guess_star_from_path(e.path))
         if not star: continue
         try:
-            st = p.stat()
-            upsert_artifact(run_id, star, kind, str(p), st.st_size, st.st_mtime)
+            st = e.stat()
+            upsert_artifact(run_id, star, kind, e.path, st.st_size, st.st_mtime)
             cnt += 1
         except Exception:
             pass
@@ -269,6 +324,20 @@ def list_artifacts_for_star(star: str)->List[Dict]:
     con.close()
     return rows
 
+def first_artifact_for_star(star: str, kinds: Tuple[str,...])->Optional[Dict]:
+    """Newest artifact of the first available kind, in the preference order given by kinds."""
+    if not kinds: return None
+    ph = ",".join("?"*len(kinds))
+    pref = " ".join(f"WHEN ? THEN {i}" for i in range(len(kinds)))
+    con=_conn()
+    r=con.execute(f"""SELECT run_id, kind, path, size, mtime
+                      FROM artifacts WHERE star = ? AND kind IN ({ph})
+                      ORDER BY CASE kind {pref} END, mtime DESC LIMIT 1""",
+                  (star.upper(), *kinds, *kinds)).fetchone()
+    con.close()
+    if not r: return None
+    return {"run_id":r[0], "star":star.upper(), "kind":r[1], "path":r[2], "size":r[3], "mtime":r[4]}
+
 # ---------- API Keys ----------
 def api_keys_insert(name:str, role:str, salt:str, hash_:str)->int:
     con=_conn()
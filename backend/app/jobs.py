@@ -6,6 +6,7 @@ from .models import JobInfo
 from .storage import save_job, append_log, is_cancelled
 from .metrics import read_metrics
 from .db import ingest_candidates, ingest_metrics, bulk_index_dir, upsert_metrics_detail
+from .workbench import invalidate_negative_cache
 
 ARTIFACTS_ROOT = Path(os.environ.get("ARTIFACTS_ROOT","/app/artifacts"))
 PROJECT_ROOT = Path(os.environ.get("PROJECT_ROOT", "/app"))
@@ -107,6 +108,8 @@ async def run_job(info: JobInfo):
             result_file.write_text(json.dumps(result_data, indent=2))
             
             append_log(info.job_id, f"📦 Artifacts saved to: {info.artifacts_dir}")
+            # new artifacts may resolve earlier workbench misses
+            invalidate_negative_cache()
         else:
             append_log(info.job_id, f"❌ Job failed with exit code: {proc.returncode}")
             info.state = "failed"
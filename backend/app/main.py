@@ -1,24 +1,27 @@
 from __future__ import annotations
 import os, json, asyncio, io, csv, hashlib
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Tuple
 import numpy as np
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Body, Response, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from .models import StartJobRequest, JobInfo, JobList
-from .storage import create_job, load_job, list_jobs, has_duplicate_running, mark_cancel
+from .storage import create_job, load_job, list_jobs, has_duplicate_running, mark_cancel, import_legacy_jobs, reset_caches
 from .jobs import ARTIFACTS_ROOT
 from .contracts import MetricsSummary, BenchmarkReport, CandidatePage
 from .metrics import read_metrics, read_benchmarks, list_candidates
 from .orchestrator import orchestrator
 from .db import init_db, list_incomplete_jobs, list_metrics as db_list_metrics, count_metrics as db_count_metrics, get_metrics_summary as db_get_metrics_summary, get_metrics_detail as db_get_metrics_detail, count_candidates_by_run as db_count_candidates_by_run, bulk_index_dir
 from .storage import load_job
-from .workbench import get_raw_lightcurve, get_phase_curve, get_oddeven, get_centroid
-from .reliability import api_calibration, api_ece_bins, api_pr_overlay, api_pr_curve, pr_interp_on_grid, api_calibration_bins
+from .workbench import get_raw_lightcurve, get_phase_curve, get_oddeven, get_centroid, invalidate_negative_cache
+from .workbench import get_raw_lightcurve_arrow, get_centroid_arrow, ARROW_STREAM_MEDIA_TYPE
+from .reliability import api_calibration, api_ece_bins, api_pr_overlay, api_pr_curve, pr_interp_on_grid, api_calibration_bins, _oof_path
 from .reliability_cache import build_cache_for_run, _cached_path, serve_cached_or_404
 from .db import list_artifacts_for_star
 from .security import verify_key, role_at_least, PUBLIC_READ
+from .artifact_watch import start_watcher, stop_watcher
 from .alerts_store import list_recent as alerts_list_recent, append_event as alerts_append_event, rules_get as alerts_rules_get, upsert_rule as alerts_upsert_rule, delete_rule as alerts_delete_rule, set_rule_muted as alerts_set_rule_muted, channel_health as alerts_channel_health, outbox_write as alerts_outbox_write
 import asyncio, os, time, pathlib
 import contextlib
@@ -50,7 +53,7 @@ async def rbac_guard(request: Request, call_next):
     token = request.headers.get("X-API-Key","").strip()
     role = "anonymous"
     if token:
-        v = verify_key(token)
+        v = await verify_key(token)
         if v:
             role = v[1]
     request.state.role = role
@@ -72,6 +75,11 @@ def require_admin(request: Request):
 @app.on_event("startup")
 async def _startup():
     init_db()
+    # job.json dirs without a DB row (pre-migration, or the DB was lost) become rows again
+    try:
+        import_legacy_jobs()
+    except Exception:
+        pass
     # Recover jobs that were queued or running previously
     try:
         for job_id in list_incomplete_jobs():
@@ -81,10 +89,16 @@ async def _startup():
                 await orchestrator.enqueue(j)
     except Exception:
         pass
+    # keep the artifact index warm so workbench requests rarely fall back to _targeted_scan
+    try:
+        start_watcher(ARTIFACTS_ROOT)
+    except Exception:
+        pass
     await orchestrator.start()
 
 @app.on_event("shutdown")
 async def _shutdown():
+    stop_watcher()
     await orchestrator.stop()
 
 @app.get("/api/health")
@@ -145,6 +159,7 @@ async def clear_all_jobs():
             if job_dir.is_dir():
                 shutil.rmtree(job_dir)
                 fs_count += 1
+    reset_caches()
     
     return {"status":"cleared", "db_count": db_count, "fs_count": fs_count, "total": db_count + fs_count}
 
@@ -296,7 +311,11 @@ def dossier(star_id: str):
     raise HTTPException(404, "dossier not found")
 
 @app.get("/api/workbench/lightcurve/{star_id}")
-def wb_lightcurve(star_id: str):
+def wb_lightcurve(star_id: str, format: str="json"):
+    if format not in ("json","arrow"):
+        raise HTTPException(422, "format must be 'json' or 'arrow'")
+    if format == "arrow":
+        return Response(content=get_raw_lightcurve_arrow(ARTIFACTS_ROOT, star_id), media_type=ARROW_STREAM_MEDIA_TYPE)
     return get_raw_lightcurve(ARTIFACTS_ROOT, star_id)
 
 @app.get("/api/workbench/phase/{star_id}")
@@ -308,7 +327,11 @@ def wb_oddeven(star_id: str):
     return get_oddeven(ARTIFACTS_ROOT, star_id)
 
 @app.get("/api/workbench/centroid/{star_id}")
-def wb_centroid(star_id: str):
+def wb_centroid(star_id: str, format: str="json"):
+    if format not in ("json","arrow"):
+        raise HTTPException(422, "format must be 'json' or 'arrow'")
+    if format == "arrow":
+        return Response(content=get_centroid_arrow(ARTIFACTS_ROOT, star_id), media_type=ARROW_STREAM_MEDIA_TYPE)
     return get_centroid(ARTIFACTS_ROOT, star_id)
 
 @app.get("/api/workbench/index/{star_id}")
@@ -471,6 +494,7 @@ def admin_reindex(request: Request):
     require_admin(request)
     # reindex current ARTIFACTS_ROOT recursively
     bulk_index_dir(run_id="__admin__", root=ARTIFACTS_ROOT, star_hint=None)
+    invalidate_negative_cache()
     return {"status":"ok","indexed_root": str(ARTIFACTS_ROOT)}
 
 # ---------- Admin cache builders ----------
@@ -648,13 +672,16 @@ def api_alerts_test_send(payload: dict, user=Depends(_require_operator)):
 
 # -------- Auth endpoints --------
 
+_COMPARE_RECALL_GRID = np.linspace(0.0, 1.0, 101)
+_COMPARE_RECALL_GRID.flags.writeable = False
+
 @app.get("/api/reliability/compare_pr")
 def reliability_compare_pr(run_a: str, run_b: str, model: str="ens"):
     if model not in ("ens","h1"):
         raise HTTPException(422, "model must be 'ens' or 'h1'")
     pra = api_pr_curve(run_a, model=model)
     prb = api_pr_curve(run_b, model=model)
-    grid = np.linspace(0.0, 1.0, 101)
+    grid = _COMPARE_RECALL_GRID
     pa = pr_interp_on_grid(pra, grid)
     pb = pr_interp_on_grid(prb, grid)
     return {
@@ -728,17 +755,84 @@ def reliability_compare_cal_csv(run_a: str, run_b: str, model: str="ens", bins:
 def _sha256_path_or_none(p):
     if not p: return None
     try:
-        b = p.read_bytes()
-        return hashlib.sha256(b).hexdigest()
+        # streamed in blocks, so large artifacts are never held in memory
+        with open(p, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
     except Exception:
         return None
 
+REPORTS_SUBDIR = "reports"
+# rendered reports kept on disk; every input change writes a new key, so older ones are pruned
+REPORTS_MAX = int(os.environ.get("REPORTS_MAX", "256"))
+_GATE_LABEL = {(True,False):"PASS→FAIL", (False,True):"FAIL→PASS", (True,True):"PASS↔PASS", (False,False):"FAIL↔FAIL"}
+
+# bump when the report layout changes, so previously rendered reports are not served
+REPORT_FORMAT_VERSION = 2
+
+def _stat_stamp(p)->Optional[Tuple[int,int]]:
+    try:
+        st = os.stat(p)
+        return (st.st_mtime_ns, st.st_size)
+    except (OSError, TypeError):
+        return None
+
+def _report_inputs(run_id: str)->list:
+    """Stamps of every file-backed input of a run's report section: OOF CSV and cached pr_ens.json."""
+    try:
+        oof = _stat_stamp(_oof_path(run_id))
+    except HTTPException:
+        oof = None
+    return [oof, _stat_stamp(_cached_path(run_id, "pr_ens.json"))]
+
+def _report_key(run_a: str, run_b: str, a: dict, b: dict, fmt: str)->str:
+    # metrics created_at changes on re-ingest; OOF/cache stamps and gates can change without one
+    gates = gates_compare(run_a, run_b)["changes"]
+    raw = json.dumps([REPORT_FORMAT_VERSION, fmt, run_a, run_b, a.get("created_at"), b.get("created_at"),
+                      _report_inputs(run_a), _report_inputs(run_b), gates], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _report_cache(request: Request, key: str, ext: str, media_type: str, builder)->Response:
+    """Serve a rendered report from ARTIFACTS_ROOT/reports/<key>.<ext>, building it on first use."""
+    # private: reports sit behind RBAC, so shared caches must not store them
+    headers = {"ETag": f'"{key}"', "Cache-Control": "private, max-age=3600"}
+    inm = request.headers.get("if-none-match", "")
+    if any(t.strip().removeprefix("W/").strip('"') == key for t in inm.split(",")):
+        return Response(status_code=304, headers=headers)
+    path = ARTIFACTS_ROOT / REPORTS_SUBDIR / f"{key}.{ext}"
+    if path.exists():
+        return FileResponse(path, media_type=media_type, headers=headers)
+    body = builder().encode("utf-8")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{ext}.tmp")
+    tmp.write_bytes(body)
+    os.replace(tmp, path)
+    _prune_reports(path.parent)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+def _prune_reports(d: Path)->None:
+    """Keep the newest REPORTS_MAX rendered reports by mtime."""
+    files = []
+    with os.scandir(d) as it:
+        for e in it:
+            if e.is_file() and not e.name.endswith(".tmp"):
+                try: files.append((e.stat().st_mtime_ns, e.path))
+                except OSError: pass
+    if len(files) <= REPORTS_MAX: return
+    files.sort(reverse=True)
+    for _, old in files[REPORTS_MAX:]:
+        try: os.remove(old)
+        except OSError: pass
+
 @app.get("/api/compare/report.csv")
-def compare_report_csv(run_a: str, run_b: str):
+def compare_report_csv(request: Request, run_a: str, run_b: str):
     a = db_get_metrics_summary(run_a)
     b = db_get_metrics_summary(run_b)
     if not a or not b:
         raise HTTPException(404, "one or both run IDs not found")
+    key = _report_key(run_a, run_b, a, b, "csv")
+    return _report_cache(request, key, "csv", "text/csv", lambda: _build_report_csv(run_a, run_b, a, b))
+
+def _build_report_csv(run_a: str, run_b: str, a: dict, b: dict)->str:
     # PR stats (ensemble)
     pr_json = reliability_compare_pr(run_a, run_b, model="ens")
     # Δ-PR area (trapezoid integral of delta precision over recall grid)
@@ -766,16 +860,20 @@ def compare_report_csv(run_a: str, run_b: str):
     # Gate diffs (flatten)
     gd = gates_compare(run_a, run_b)
     for gk, gv in sorted((gd.get("changes") or {}).items()):
-        label = ("PASS→FAIL" if gv["a"] and not gv["b"] else ("FAIL→PASS" if (not gv["a"] and gv["b"]) else ("PASS↔PASS" if gv["a"] else "FAIL↔FAIL")))
+        label = _GATE_LABEL[(bool(gv["a"]), bool(gv["b"]))]
         w.writerow([f"gate:{gk}", "PASS" if gv["a"] else "FAIL", "PASS" if gv["b"] else "FAIL", label])
-    return Response(content=buf.getvalue(), media_type="text/csv")
+    return buf.getvalue()
 
 @app.get("/api/compare/report.md")
-def compare_report_md(run_a: str, run_b: str):
+def compare_report_md(request: Request, run_a: str, run_b: str):
     a = db_get_metrics_summary(run_a)
     b = db_get_metrics_summary(run_b)
     if not a or not b:
         raise HTTPException(404, "one or both run IDs not found")
+    key = _report_key(run_a, run_b, a, b, "md")
+    return _report_cache(request, key, "md", "text/markdown; charset=utf-8", lambda: _build_report_md(run_a, run_b, a, b))
+
+def _build_report_md(run_a: str, run_b: str, a: dict, b: dict)->str:
     prj = reliability_compare_pr(run_a, run_b, model="ens")
     # Δ-PR area
     r = prj["recall"]; dp = prj["delta_precision"]
@@ -785,11 +883,9 @@ def compare_report_md(run_a: str, run_b: str):
     # Cache checksums (if present)
     a_ens = _cached_path(run_a, "pr_ens.json"); b_ens = _cached_path(run_b, "pr_ens.json")
     sha_a = _sha256_path_or_none(a_ens); sha_b = _sha256_path_or_none(b_ens)
-    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     # Markdown
     md = []
     md.append(f"# Chiss Run Compare Report\n")
-    md.append(f"- Generated: **{now}** UTC")
     md.append(f"- Run A: `{run_a}`  |  Run B: `{run_b}`")
     if sha_a or sha_b:
         md.append(f"- Cache PR checksums — A: `{sha_a or 'n/a'}`, B: `{sha_b or 'n/a'}`")
@@ -819,7 +915,7 @@ def compare_report_md(run_a: str, run_b: str):
         md.append("| Gate | A | B | Change |")
         md.append("|---|:--:|:--:|:--:|")
         for gk, gv in sorted(changes.items()):
-            label = ("PASS→FAIL" if gv["a"] and not gv["b"] else ("FAIL→PASS" if (not gv["a"] and gv["b"]) else ("PASS↔PASS" if gv["a"] else "FAIL↔FAIL")))
+            label = _GATE_LABEL[(bool(gv["a"]), bool(gv["b"]))]
             md.append(f"| {gk} | {'PASS' if gv['a'] else 'FAIL'} | {'PASS' if gv['b'] else 'FAIL'} | {label} |")
     md.append("")
     md.append("## PR/Δ-PR Stats (Ensemble)")
@@ -827,6 +923,5 @@ def compare_report_md(run_a: str, run_b: str):
     md.append(f"- Overlay permalink: `?tab=compare&run_a={run_a}&run_b={run_b}`")
     md.append("")
     md.append("_Report generated by Chiss dashboard D-14._\n")
-    text = "\n".join(md)
-    return Response(content=text, media_type="text/markdown; charset=utf-8")
+    return "\n".join(md)
 
@@ -85,10 +85,10 @@ def list_candidates(artifacts_root: Path, limit:int=50, min_p:float=0.0) -> Cand
     df = pd.read_csv(preds)
     if "p_final" not in df.columns or "star" not in df.columns:
         raise HTTPException(status_code=422, detail="oof_stage2.csv missing required columns star,p_final")
-    df = df.sort_values("p_final", ascending=False)
     if min_p>0: df = df[df["p_final"]>=min_p]
     total = len(df)
-    df = df.head(limit)
+    # partial selection: O(N log k) instead of sorting the whole frame
+    df = df.nlargest(limit, "p_final")
     items = []
     keep_extra = [c for c in df.columns if c not in ("star","label","p_final")]
     for _, row in df.iterrows():
@@ -3,7 +3,7 @@ import asyncio, os, signal, time
 from typing import Dict, Optional
 from pathlib import Path
 from .models import JobInfo, JobType
-from .storage import save_job, append_log, is_cancelled, list_jobs
+from .storage import save_job, append_log, close_log, is_cancelled, list_jobs
 from .jobs import exec_process, ARTIFACTS_ROOT
 
 MAX_CONCURRENCY = int(os.environ.get("JOB_MAX_CONCURRENCY","2"))
@@ -39,6 +39,8 @@ class Orchestrator:
                 await self._run_with_retries(info)
             finally:
                 self.running.pop(info.job_id, None)
+                # retry/failure messages are appended after the job's final save
+                close_log(info.job_id)
                 self.q.task_done()
 
     async def _run_with_retries(self, info: JobInfo):
@@ -1,5 +1,5 @@
 from __future__ import annotations
-import json, os
+import json, os, time, functools
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import numpy as np
@@ -8,8 +8,15 @@ from fastapi import HTTPException
 from .main import ARTIFACTS_ROOT
 from .storage import load_job
 
+JOB_CACHE_TTL_SEC = 5
+
+@functools.lru_cache(maxsize=256)
+def _load_job_cached(run_id: str, stamp: int):
+    # stamp buckets monotonic time so entries expire after JOB_CACHE_TTL_SEC
+    return load_job(run_id)
+
 def _run_artifacts_dir(run_id: str)->Path:
-    job = load_job(run_id)
+    job = _load_job_cached(run_id, int(time.monotonic() // JOB_CACHE_TTL_SEC))
     if not job or not job.artifacts_dir:
         raise HTTPException(404, f"run_id {run_id} not found or has no artifacts_dir")
     p = Path(job.artifacts_dir)
@@ -17,7 +24,7 @@ def _run_artifacts_dir(run_id: str)->Path:
         raise HTTPException(404, f"artifacts_dir for run {run_id} does not exist")
     return p
 
-def _load_oof(run_id: str)->pd.DataFrame:
+def _oof_path(run_id: str)->Path:
     root = _run_artifacts_dir(run_id)
     # primary location
     p = root / "stage2" / "oof_stage2.csv"
@@ -26,67 +33,96 @@ def _load_oof(run_id: str)->pd.DataFrame:
         p = ARTIFACTS_ROOT / "stage2" / "oof_stage2.csv"
     if not p.exists():
         raise HTTPException(404, f"OOF not found for run {run_id}; expected stage2/oof_stage2.csv")
+    return p
+
+def _load_oof(run_id: str)->pd.DataFrame:
+    p = _oof_path(run_id)
+    try:
+        st = p.stat()
+    except OSError:
+        raise HTTPException(404, f"OOF not found for run {run_id}; expected stage2/oof_stage2.csv")
+    return _read_oof(str(p), st.st_mtime_ns, st.st_size)
+
+@functools.lru_cache(maxsize=8)
+def _read_oof(path: str, mtime_ns: int, size: int)->pd.DataFrame:
+    # keyed on (mtime, size): a rewritten OOF is re-read; callers must not mutate the result
+    p = Path(path)
     try:
-        df = pd.read_csv(p)
+        cols = pd.read_csv(p, nrows=0).columns
     except Exception as e:
         raise HTTPException(422, f"Failed to read OOF CSV: {e}")
     # normalize columns
-    label_col = next((c for c in df.columns if c.lower() in ("label","y")), None)
-    ens_col   = next((c for c in df.columns if c.lower() in ("p_final","p_ens","p")), None)
-    h1_col    = next((c for c in df.columns if c.lower() in ("p_h1","h1","p_gbm","p_lgbm")), None)
+    label_col = next((c for c in cols if c.lower() in ("label","y")), None)
+    ens_col   = next((c for c in cols if c.lower() in ("p_final","p_ens","p")), None)
+    h1_col    = next((c for c in cols if c.lower() in ("p_h1","h1","p_gbm","p_lgbm")), None)
     if label_col is None or ens_col is None:
         raise HTTPException(422, "OOF CSV must include label and p_final columns")
+    # parse only the columns used; labels stay float here so "1.0"-style values still load
+    use = [c for c in (label_col, ens_col, h1_col) if c is not None]
+    try:
+        df = pd.read_csv(p, usecols=use, dtype={c: "float32" for c in use}, engine="pyarrow")
+    except Exception as e:
+        raise HTTPException(422, f"Failed to read OOF CSV: {e}")
+    # rows without a label or ens score are unusable; NaN h1 is dropped only on the h1 path
+    df = df.dropna(subset=[label_col, ens_col])
+    # probabilities in [0,1] and 0/1 labels: float32/int8 halve the working set
     out = {
-        "y": df[label_col].astype(int).to_numpy(),
-        "p_ens": df[ens_col].astype(float).to_numpy()
+        "y": df[label_col].to_numpy(np.int8),
+        "p_ens": df[ens_col].to_numpy(np.float32)
     }
     if h1_col is not None:
-        out["p_h1"] = df[h1_col].astype(float).to_numpy()
+        out["p_h1"] = df[h1_col].to_numpy(np.float32)
     return pd.DataFrame(out)
 
+@functools.lru_cache(maxsize=16)
+def _bin_edges(bins: int)->np.ndarray:
+    edges = np.linspace(0.0, 1.0, bins+1)
+    edges.flags.writeable = False  # shared between callers
+    return edges
+
 def _calibration_bins(y: np.ndarray, p: np.ndarray, bins:int=15)->Dict:
     bins = int(max(2, min(100, bins)))
-    edges = np.linspace(0.0, 1.0, bins+1)
+    edges = _bin_edges(bins)
     idx = np.clip(np.digitize(p, edges) - 1, 0, bins-1)
-    conf_mean = np.zeros(bins, dtype=float)
-    acc = np.zeros(bins, dtype=float)
-    counts = np.zeros(bins, dtype=int)
-    for b in range(bins):
-        mask = (idx == b)
-        n = int(mask.sum())
-        counts[b] = n
-        if n > 0:
-            conf_mean[b] = float(p[mask].mean())
-            acc[b] = float(y[mask].mean())
-        else:
-            conf_mean[b] = float((edges[b] + edges[b+1]) / 2.0)
-            acc[b] = np.nan
+    # per-bin count and sums in one pass each; no per-bin masking
+    counts = np.bincount(idx, minlength=bins)
+    sum_p = np.bincount(idx, weights=p, minlength=bins)
+    sum_y = np.bincount(idx, weights=y, minlength=bins)
+    mids = (edges[:-1] + edges[1:]) / 2.0
+    filled = counts > 0
+    n = np.maximum(counts, 1)
+    # empty bins: confidence at the bin midpoint, accuracy undefined
+    conf_mean = np.where(filled, sum_p / n, mids)
+    acc = np.where(filled, sum_y / n, np.nan)
     # Expected Calibration Error
     N = len(y)
-    gaps = np.abs(acc - conf_mean)
-    gaps[np.isnan(gaps)] = 0.0
+    gaps = np.where(filled, np.abs(acc - conf_mean), 0.0)
     ece = float(np.sum((counts / max(1,N)) * gaps))
-    mids = (edges[:-1] + edges[1:]) / 2.0
     return {"bin_mid": mids.tolist(), "conf_mean": conf_mean.tolist(), "acc": acc.tolist(), "count": counts.tolist(), "ece": ece}
 
 def _pr_curve(y: np.ndarray, p: np.ndarray)->Dict:
+    if len(p) == 0:
+        return {"precision": [1.0], "recall": [0.0], "auprc": 0.0}
     # sort by score desc
-    order = np.argsort(-p)
+    order = np.argsort(-p, kind="stable")
+    p_sorted = p[order]
     y_sorted = y[order]
-    tp = np.cumsum(y_sorted)
-    fp = np.cumsum(1 - y_sorted)
-    denom = tp + fp
-    denom[denom==0] = 1
-    precision = tp / denom
+    # one operating point per distinct score, so tied scores are never split
+    last = np.r_[np.flatnonzero(np.diff(p_sorted)), len(p_sorted) - 1]
+    tp = np.cumsum(y_sorted)[last]
+    precision = tp / (last + 1)
     P = max(1, int(y.sum()))
     recall = tp / P
+    # AUPRC as average precision (step-function sum); trapezoids overestimate between points
+    auprc = float(np.sum(np.diff(recall, prepend=0.0) * precision))
     # prepend (0,1) per convention
     precision = np.concatenate(([1.0], precision))
     recall = np.concatenate(([0.0], recall))
-    # AUPRC via trapezoid
-    auprc = float(np.trapz(precision, recall))
     return {"precision": precision.tolist(), "recall": recall.tolist(), "auprc": auprc}
 
+# path -> (st_mtime_ns, parsed curve); baseline files are effectively static
+_BASELINE_CACHE: Dict[Path, Tuple[int, Dict]] = {}
+
 def _try_load_baseline_curves()->List[Dict]:
     # Best-effort: scan typical paths for baseline PR curves; ignore on failure
     out=[]
@@ -98,26 +134,30 @@ def _try_load_baseline_curves()->List[Dict]:
     ]
     for p in candidates:
         try:
-            if p.exists():
-                df = pd.read_csv(p)
-                rcol = next((c for c in df.columns if "recall" in c.lower()), None)
-                pcol = next((c for c in df.columns if "precision" in c.lower()), None)
-                name = "robovetter" if "robo" in p.name.lower() else ("exominer" if "exo" in p.name.lower() else p.stem)
-                if rcol and pcol:
-                    out.append({"name": name, "recall": df[rcol].astype(float).tolist(), "precision": df[pcol].astype(float).tolist()})
+            st = p.stat()
+        except OSError:
+            _BASELINE_CACHE.pop(p, None)
+            continue
+        try:
+            hit = _BASELINE_CACHE.get(p)
+            if hit and hit[0] == st.st_mtime_ns:
+                out.append(hit[1])
+                continue
+            cols = pd.read_csv(p, nrows=0).columns
+            rcol = next((c for c in cols if "recall" in c.lower()), None)
+            pcol = next((c for c in cols if "precision" in c.lower()), None)
+            name = "robovetter" if "robo" in p.name.lower() else ("exominer" if "exo" in p.name.lower() else p.stem)
+            if rcol and pcol:
+                df = pd.read_csv(p, usecols=[rcol, pcol])
+                curve = {"name": name, "recall": df[rcol].astype(float).tolist(), "precision": df[pcol].astype(float).tolist()}
+                _BASELINE_CACHE[p] = (st.st_mtime_ns, curve)
+                out.append(curve)
         except Exception:
             pass
     return out
 
 def api_calibration(run_id: str, bins:int=15, model:str="ens")->Dict:
-    df = _load_oof(run_id)
-    y = df["y"].to_numpy()
-    if model=="h1":
-        if "p_h1" not in df.columns:
-            raise HTTPException(404, "H1 probabilities not available in OOF")
-        p = df["p_h1"].to_numpy()
-    else:
-        p = df["p_ens"].to_numpy()
+    y, p = _pick_probs(_load_oof(run_id), model)
     return _calibration_bins(y, p, bins=bins)
 
 def api_ece_bins(run_id: str, bins:int=15, model:str="ens")->Dict:
@@ -128,20 +168,12 @@ def api_pr_overlay(run_id: str)->Dict:
     y = df["y"].to_numpy()
     curves = {"ens": _pr_curve(y, df["p_ens"].to_numpy())}
     if "p_h1" in df.columns:
-        curves["h1"] = _pr_curve(y, df["p_h1"].to_numpy())
+        curves["h1"] = _pr_curve(*_h1_arrays(df))
     baselines = _try_load_baseline_curves()
     return {"curves": curves, "baselines": baselines}
 
 def api_pr_curve(run_id: str, model: str="ens")->Dict:
-    df = _load_oof(run_id)
-    y = df["y"].to_numpy()
-    if model == "h1":
-        if "p_h1" not in df.columns:
-            from fastapi import HTTPException
-            raise HTTPException(404, "H1 probabilities not available")
-        p = df["p_h1"].to_numpy()
-    else:
-        p = df["p_ens"].to_numpy()
+    y, p = _pick_probs(_load_oof(run_id), model)
     return _pr_curve(y, p)
 
 def pr_interp_on_grid(pr: Dict, grid: np.ndarray)->np.ndarray:
@@ -157,14 +189,19 @@ def pr_interp_on_grid(pr: Dict, grid: np.ndarray)->np.ndarray:
     # Interp precision at given recall grid
     return np.interp(grid, r, p, left=p[0], right=p[-1])
 
-def _pick_probs(df, model:str):
+def _h1_arrays(df)->Tuple[np.ndarray, np.ndarray]:
+    """(y, p_h1) restricted to rows that have an h1 score."""
+    p = df["p_h1"].to_numpy()
+    ok = ~np.isnan(p)
+    return df["y"].to_numpy()[ok], p[ok]
+
+def _pick_probs(df, model:str)->Tuple[np.ndarray, np.ndarray]:
     if model == "h1":
         if "p_h1" not in df.columns:
-            from fastapi import HTTPException
             raise HTTPException(404, "H1 probabilities not available")
-        return df["p_h1"].to_numpy()
+        return _h1_arrays(df)
     else:
-        return df["p_ens"].to_numpy()
+        return df["y"].to_numpy(), df["p_ens"].to_numpy()
 
 def api_calibration_bins(run_id: str, model: str="ens", bins: int = 15)->Dict:
     """
@@ -182,35 +219,29 @@ def api_calibration_bins(run_id: str, model: str="ens", bins: int = 15)->Dict:
     """
     if bins < 2: bins = 2
     df = _load_oof(run_id)
-    y = df["y"].to_numpy().astype(float)
-    p = _pick_probs(df, model)
+    y, p = _pick_probs(df, model)
+    y = y.astype(float)
     # Fixed bins
-    edges = np.linspace(0.0, 1.0, bins+1)
+    edges = _bin_edges(bins)
     centers = 0.5*(edges[:-1] + edges[1:])
     idx = np.digitize(p, edges, right=True) - 1
     idx = np.clip(idx, 0, bins-1)
-    conf = np.full(bins, np.nan)
-    acc  = np.full(bins, np.nan)
-    cnt  = np.zeros(bins, dtype=int)
-    for b in range(bins):
-        m = (idx == b)
-        cnt[b] = int(m.sum())
-        if cnt[b] > 0:
-            pb = p[m]
-            yb = y[m]
-            conf[b] = float(np.mean(pb))
-            acc[b]  = float(np.mean(yb))
+    cnt  = np.bincount(idx, minlength=bins)
+    filled = cnt > 0
+    n_b  = np.maximum(cnt, 1)
+    conf = np.where(filled, np.bincount(idx, weights=p, minlength=bins) / n_b, np.nan)
+    acc  = np.where(filled, np.bincount(idx, weights=y, minlength=bins) / n_b, np.nan)
     gap = acc - conf
     n = max(int(len(y)), 1)
     ece = float(np.nansum(np.abs(gap) * (cnt / n)))
     # Convert NaNs to None for JSON
-    def clean(a): return [ (None if (x is None or (isinstance(x,float) and (np.isnan(x) or not np.isfinite(x)))) else float(x)) for x in a ]
+    def clean(a): return np.where(np.isfinite(a), a, None).tolist()
     return {
         "edges": edges.tolist(),
         "centers": centers.tolist(),
         "confidence": clean(conf),
         "accuracy": clean(acc),
         "gap": clean(gap),
-        "count": [int(c) for c in cnt],
+        "count": cnt.tolist(),
         "ece": ece
     }
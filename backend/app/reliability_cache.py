@@ -1,12 +1,16 @@
 from __future__ import annotations
-import json, csv, hashlib, io, time
+import hashlib, time
+import orjson
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 import numpy as np
+import pandas as pd
 from fastapi import HTTPException, Response
 
 CACHE_SUBDIR = "reliability"
 DEFAULT_BINS = 15
+# bump when the cached payloads change shape or meaning, so existing caches are rebuilt
+CACHE_VERSION = 2
 
 def _sha256_bytes(b: bytes)->str:
     return hashlib.sha256(b).hexdigest()
@@ -16,63 +20,79 @@ def _write(path: Path, content: bytes):
     path.write_bytes(content)
     return _sha256_bytes(content)
 
+def _to_csv_bytes(cols: Dict)->bytes:
+    # na_rep/lineterminator match the csv.writer output of the uncached endpoints
+    return pd.DataFrame(cols).to_csv(index=False, na_rep="nan", lineterminator="\r\n").encode()
+
+def _calibration_csv(cal: Dict)->bytes:
+    return _to_csv_bytes({"bin_mid": cal["bin_mid"], "conf_mean": cal["conf_mean"], "acc": cal["acc"], "count": cal["count"], "ece": cal["ece"]})
+
+def _pr_csv(pr: Dict)->bytes:
+    return _to_csv_bytes({"recall": pr["recall"], "precision": pr["precision"], "auprc": pr["auprc"]})
+
+def _current_manifest(outdir: Path, bins: int, source_sha: str)->Optional[Dict]:
+    """The existing manifest if it was built by this CACHE_VERSION from the same OOF bytes and bins, with all its files present."""
+    try:
+        manifest = orjson.loads((outdir / "manifest.json").read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+    if (manifest.get("version") != CACHE_VERSION or manifest.get("source_sha256") != source_sha
+            or manifest.get("bins") != bins):
+        return None
+    if not all((outdir / name).exists() for name in manifest.get("files", {})):
+        return None
+    return manifest
+
 def build_cache_for_run(run_id: str, bins:int=DEFAULT_BINS)->Dict:
     """Compute and write reliability cache for a run. Returns manifest dict."""
-    from .reliability import _run_artifacts_dir, _load_oof, _calibration_bins, _pr_curve
+    from .reliability import _run_artifacts_dir, _oof_path, _load_oof, _h1_arrays, _calibration_bins, _pr_curve
     artdir = _run_artifacts_dir(run_id)
     outdir = artdir / CACHE_SUBDIR
+    with open(_oof_path(run_id), "rb") as f:
+        source_sha = hashlib.file_digest(f, "sha256").hexdigest()
+    prev = _current_manifest(outdir, bins, source_sha)
+    if prev is not None:
+        return prev
     df = _load_oof(run_id)
     y = df["y"].to_numpy()
     # ENS
-    cal_ens = _calibration_bins(y, df["p_ens"].to_numpy(), bins=bins)
-    pr_ens = _pr_curve(y, df["p_ens"].to_numpy())
+    p_ens = df["p_ens"].to_numpy()
+    cal_ens = _calibration_bins(y, p_ens, bins=bins)
+    pr_ens = _pr_curve(y, p_ens)
     # H1 optional
     cal_h1 = pr_h1 = None
     if "p_h1" in df.columns:
-        cal_h1 = _calibration_bins(y, df["p_h1"].to_numpy(), bins=bins)
-        pr_h1 = _pr_curve(y, df["p_h1"].to_numpy())
+        y_h1, p_h1 = _h1_arrays(df)
+        cal_h1 = _calibration_bins(y_h1, p_h1, bins=bins)
+        pr_h1 = _pr_curve(y_h1, p_h1)
     # Write JSON
     files = {}
     tnow = time.time()
-    cal_ens_json = json.dumps({"model":"ens","bins":bins,"data":cal_ens,"created_at":tnow}).encode()
+    cal_ens_json = orjson.dumps({"model":"ens","bins":bins,"data":cal_ens,"created_at":tnow})
     files["calibration_ens_bins15.json"] = _write(outdir / "calibration_ens_bins15.json", cal_ens_json)
-    pr_ens_json = json.dumps({"model":"ens","data":pr_ens,"created_at":tnow}).encode()
+    pr_ens_json = orjson.dumps({"model":"ens","data":pr_ens,"created_at":tnow})
     files["pr_ens.json"] = _write(outdir / "pr_ens.json", pr_ens_json)
     # CSV (ens)
-    buf = io.StringIO(); w = csv.writer(buf)
-    w.writerow(["bin_mid","conf_mean","acc","count","ece"])
-    for i in range(len(cal_ens["bin_mid"])):
-        w.writerow([cal_ens["bin_mid"][i], cal_ens["conf_mean"][i], cal_ens["acc"][i], cal_ens["count"][i], cal_ens["ece"]])
-    files["calibration_ens_bins15.csv"] = _write(outdir / "calibration_ens_bins15.csv", buf.getvalue().encode())
-    buf = io.StringIO(); w = csv.writer(buf)
-    w.writerow(["recall","precision","auprc"])
-    for r,p in zip(pr_ens["recall"], pr_ens["precision"]):
-        w.writerow([r,p,pr_ens["auprc"]])
-    files["pr_ens.csv"] = _write(outdir / "pr_ens.csv", buf.getvalue().encode())
+    files["calibration_ens_bins15.csv"] = _write(outdir / "calibration_ens_bins15.csv", _calibration_csv(cal_ens))
+    files["pr_ens.csv"] = _write(outdir / "pr_ens.csv", _pr_csv(pr_ens))
     # H1 outputs if present
     if cal_h1 is not None and pr_h1 is not None:
-        cal_h1_json = json.dumps({"model":"h1","bins":bins,"data":cal_h1,"created_at":tnow}).encode()
+        cal_h1_json = orjson.dumps({"model":"h1","bins":bins,"data":cal_h1,"created_at":tnow})
         files["calibration_h1_bins15.json"] = _write(outdir / "calibration_h1_bins15.json", cal_h1_json)
-        buf = io.StringIO(); w = csv.writer(buf)
-        w.writerow(["bin_mid","conf_mean","acc","count","ece"])
-        for i in range(len(cal_h1["bin_mid"])):
-            w.writerow([cal_h1["bin_mid"][i], cal_h1["conf_mean"][i], cal_h1["acc"][i], cal_h1["count"][i], cal_h1["ece"]])
-        files["calibration_h1_bins15.csv"] = _write(outdir / "calibration_h1_bins15.csv", buf.getvalue().encode())
-        pr_h1_json = json.dumps({"model":"h1","data":pr_h1,"created_at":tnow}).encode()
+        files["calibration_h1_bins15.csv"] = _write(outdir / "calibration_h1_bins15.csv", _calibration_csv(cal_h1))
+        pr_h1_json = orjson.dumps({"model":"h1","data":pr_h1,"created_at":tnow})
         files["pr_h1.json"] = _write(outdir / "pr_h1.json", pr_h1_json)
-        buf = io.StringIO(); w = csv.writer(buf)
-        w.writerow(["recall","precision","auprc"])
-        for r,p in zip(pr_h1["recall"], pr_h1["precision"]):
-            w.writerow([r,p,pr_h1["auprc"]])
-        files["pr_h1.csv"] = _write(outdir / "pr_h1.csv", buf.getvalue().encode())
+        files["pr_h1.csv"] = _write(outdir / "pr_h1.csv", _pr_csv(pr_h1))
     # Manifest
     manifest = {
         "run_id": run_id,
+        "version": CACHE_VERSION,
         "bins": bins,
+        "source_sha256": source_sha,
         "created_at": tnow,
         "files": files
     }
-    _write(outdir / "manifest.json", json.dumps(manifest, indent=2).encode())
+    _write(outdir / "manifest.json", orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
     return manifest
 
 def _cached_path(run_id: str, name: str)->Optional[Path]:
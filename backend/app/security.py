@@ -1,11 +1,15 @@
 from __future__ import annotations
-import os, hmac, json, base64, secrets, hashlib
-from typing import Optional, Tuple
+import os, hmac, json, base64, secrets, hashlib, asyncio, time
+from typing import Dict, Optional, Tuple
 from .db import api_keys_all_material
 
 ROLES = {"viewer":0, "operator":1, "admin":2}
 PUBLIC_READ = os.getenv("CHISS_API_PUBLIC_READ","true").lower() in ("1","true","yes","on")
 PEPPER = os.getenv("CHISS_API_SECRET","")
+VERIFY_CACHE_TTL_SEC = float(os.getenv("CHISS_API_VERIFY_TTL_SEC","60"))
+
+# sha256(pepper+key) -> (expires_at, row_id, row_hash); successful verifications only
+_VERIFY_CACHE: Dict[str, Tuple[float,int,str]] = {}
 
 def _pbkdf2(password: bytes, salt: bytes)->bytes:
     # 200k iters PBKDF2-HMAC-SHA256 (fast enough for API keys, slow for attackers)
@@ -15,9 +19,17 @@ def hash_key(plaintext_key: str, salt_b: bytes)->str:
     digest = _pbkdf2(plaintext_key.encode("utf-8"), salt_b)
     return base64.b64encode(digest).decode("utf-8")
 
-def verify_key(presented_key: str)->Optional[Tuple[int,str]]:
-    """Return (role_level, role_name) if valid and not revoked, else None."""
+def _verify_key_sync(presented_key: str)->Optional[Tuple[int,str]]:
     mats = api_keys_all_material()
+    ck = hashlib.sha256((PEPPER + presented_key).encode("utf-8")).hexdigest()
+    hit = _VERIFY_CACHE.get(ck)
+    if hit and hit[0] > time.monotonic():
+        # re-check against current key material so revocation (e.g. via keys_cli) takes effect immediately
+        row = next((r for r in mats if r["id"] == hit[1]), None)
+        if row and not row["revoked"] and row["hash"] == hit[2]:
+            role = row["role"]
+            return (ROLES.get(role,0), role)
+    _VERIFY_CACHE.pop(ck, None)
     for row in mats:
         if row["revoked"]:
             continue
@@ -27,11 +39,20 @@ def verify_key(presented_key: str)->Optional[Tuple[int,str]]:
             got = hash_key(presented_key, salt_b)
             if hmac.compare_digest(got, want):
                 role = row["role"]
+                # never cache failures: brute-force attempts must keep paying PBKDF2
+                _VERIFY_CACHE[ck] = (time.monotonic() + VERIFY_CACHE_TTL_SEC, row["id"], want)
                 return (ROLES.get(role,0), role)
         except Exception:
             continue
     return None
 
+async def verify_key(presented_key: str)->Optional[Tuple[int,str]]:
+    """Return (role_level, role_name) if valid and not revoked, else None.
+
+    PBKDF2 runs in a worker thread so it does not block the event loop.
+    """
+    return await asyncio.to_thread(_verify_key_sync, presented_key)
+
 def role_at_least(current:str, required:str)->bool:
     return ROLES.get(current,0) >= ROLES.get(required,0)
 
@@ -1,12 +1,15 @@
 from __future__ import annotations
-import json, os, time, uuid
+import atexit, json, os, time, uuid, threading, hashlib
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Tuple, IO
 from .models import JobInfo, JobType
-from .db import upsert_job
+from .db import upsert_job, list_running_jobs, get_job_json, list_job_json
 
 JOB_ROOT = Path(os.environ.get("JOB_ROOT","/tmp/jobdata"))
 JOB_ROOT.mkdir(parents=True, exist_ok=True)
+# the jobs table is authoritative; set JOB_JSON_COMPAT=1 to keep mirroring job.json on disk
+JOB_JSON_COMPAT = os.environ.get("JOB_JSON_COMPAT", "0").lower() in ("1","true","yes","on")
 
 def _job_dir(job_id:str)->Path: return JOB_ROOT / job_id
 def _job_json(job_id:str)->Path: return _job_dir(job_id)/"job.json"
@@ -23,40 +26,173 @@ def create_job(job_type: JobType, params: Dict[str,str], artifacts_root: Path)->
         log_path=str(_job_log(job_id))
     )
     (artifacts_root / job_id).mkdir(parents=True, exist_ok=True)
-    _job_json(job_id).write_text(info.model_dump_json(indent=2), encoding="utf-8")
+    save_job(info)
     return info
 
+# (job_type, params) -> running JobInfo; seeded from the DB once, then kept current by save_job
+RUNNING: Dict[Tuple[str,frozenset], JobInfo] = {}
+_RUNNING_LOCK = threading.Lock()
+_running_seeded = False
+
+def _running_key(job_type: str, params: Dict[str,str])->Tuple[str,frozenset]:
+    return (job_type, frozenset(params.items()))
+
+def _track_running(info: JobInfo)->None:
+    k = _running_key(info.job_type, info.params)
+    with _RUNNING_LOCK:
+        if info.state == "running":
+            RUNNING[k] = info.model_copy()
+        elif k in RUNNING and RUNNING[k].job_id == info.job_id:
+            del RUNNING[k]
+
+def _seed_running()->None:
+    global _running_seeded
+    with _RUNNING_LOCK:
+        if _running_seeded: return
+        try:
+            ids = list_running_jobs()
+        except Exception:
+            return  # jobs table not initialised yet; retry on next call
+        for job_id in ids:
+            j = load_job(job_id)
+            if j and j.state == "running":
+                RUNNING[_running_key(j.job_type, j.params)] = j
+        _running_seeded = True
+
+TERMINAL_STATES = frozenset(("succeeded","completed","failed","cancelled"))
+
+# job_id -> blake2b digest of the last payload saved by this process
+_LAST_WRITE_HASH: Dict[str, bytes] = {}
+
+def _write_job_json(info: JobInfo, payload: bytes)->None:
+    """Atomically mirror the job to job.json (JOB_JSON_COMPAT only)."""
+    p = _job_json(info.job_id)
+    tmp = str(p) + ".tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
+    os.replace(tmp, p)
+    _JOB_CACHE.pop(str(p), None)
+
 def save_job(info: JobInfo)->None:
-    _job_json(info.job_id).write_text(info.model_dump_json(indent=2), encoding="utf-8")
-    # persist in DB as well
-    upsert_job(info.model_dump())
+    payload = info.model_dump_json()
+    h = hashlib.blake2b(payload.encode("utf-8"), digest_size=16).digest()
+    if _LAST_WRITE_HASH.get(info.job_id) == h:
+        return
+    upsert_job(info.model_dump(), payload)
+    if JOB_JSON_COMPAT:
+        _write_job_json(info, payload.encode("utf-8"))
+    _LAST_WRITE_HASH[info.job_id] = h
+    _track_running(info)
+    if info.state in TERMINAL_STATES:
+        close_log(info.job_id)
+
+# key -> (stamp, parsed JobInfo); the stamp is the stored info_json for DB rows and
+# (st_mtime_ns, st_size) for legacy job.json files, so unchanged jobs skip validation
+_JOB_CACHE: Dict[str, Tuple[object,JobInfo]] = {}
+
+def _parse_job_row(job_id: str, raw: str)->JobInfo:
+    hit = _JOB_CACHE.get(job_id)
+    if hit and hit[0] == raw:
+        # callers mutate JobInfo in place; hand out a copy so the cache stays clean
+        return hit[1].model_copy()
+    info = JobInfo.model_validate_json(raw)
+    _JOB_CACHE[job_id] = (raw, info)
+    return info.model_copy()
+
+def _read_job_file(path: str)->Optional[JobInfo]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        _JOB_CACHE.pop(path, None)
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _JOB_CACHE.get(path)
+    if hit and hit[0] == stamp:
+        return hit[1].model_copy()
+    try:
+        with open(path, "rb") as f:
+            info = JobInfo.model_validate_json(f.read())
+    except FileNotFoundError:
+        return None
+    _JOB_CACHE[path] = (stamp, info)
+    return info.model_copy()
 
 def load_job(job_id: str)->Optional[JobInfo]:
-    p=_job_json(job_id)
-    if not p.exists(): return None
-    return JobInfo.model_validate_json(p.read_text(encoding="utf-8"))
+    raw = get_job_json(job_id)
+    if raw:
+        return _parse_job_row(job_id, raw)
+    # rows written before info_json existed still have their job.json
+    return _read_job_file(str(_job_json(job_id)))
 
 def list_jobs()->List[JobInfo]:
     out=[]
-    for p in JOB_ROOT.iterdir():
-        if (p/_job_json(p.name).name).exists():
-            out.append(load_job(p.name))
-    out.sort(key=lambda j: j.created_at if j else 0, reverse=True)
-    return [j for j in out if j]
+    for job_id, raw in list_job_json():
+        j = _parse_job_row(job_id, raw) if raw else _read_job_file(str(_job_json(job_id)))
+        if j: out.append(j)
+    return out
+
+def import_legacy_jobs()->int:
+    """Import job.json dirs that have no info_json row (pre-migration jobs or a lost DB)."""
+    known = {job_id for job_id, raw in list_job_json() if raw}
+    n = 0
+    with os.scandir(JOB_ROOT) as it:
+        for entry in it:
+            if entry.name in known or not entry.is_dir(follow_symlinks=False): continue
+            j = _read_job_file(os.path.join(entry.path, "job.json"))
+            if j:
+                save_job(j); n += 1
+    return n
+
+def reset_caches()->None:
+    """Forget all in-process job state, e.g. after the jobs table and job dirs were wiped."""
+    global _running_seeded
+    with _RUNNING_LOCK:
+        RUNNING.clear()
+        _running_seeded = False
+    _LAST_WRITE_HASH.clear()
+    _JOB_CACHE.clear()
+    _close_logs()  # their files may have been removed with the job dirs
 
 def running_jobs()->List[JobInfo]:
     return [j for j in list_jobs() if j and j.state=="running"]
 
 def has_duplicate_running(job_type: JobType, params: Dict[str,str])->Optional[JobInfo]:
-    for j in running_jobs():
-        if j.job_type==job_type and j.params==params:
-            return j
-    return None
+    _seed_running()
+    with _RUNNING_LOCK:
+        return RUNNING.get(_running_key(job_type, params))
+
+# job_id -> line-buffered append handle, least recently used first
+_LOG_FH: "OrderedDict[str, IO[str]]" = OrderedDict()
+_LOG_LOCK = threading.Lock()
+MAX_OPEN_LOGS = int(os.environ.get("MAX_OPEN_LOGS","64"))
 
 def append_log(job_id: str, line: str)->None:
-    lp = _job_log(job_id); lp.parent.mkdir(parents=True, exist_ok=True)
-    with lp.open("a", encoding="utf-8") as f:
-        f.write(line.rstrip()+"\n")
+    with _LOG_LOCK:
+        fh = _LOG_FH.get(job_id)
+        if fh is None:
+            lp = _job_log(job_id); lp.parent.mkdir(parents=True, exist_ok=True)
+            fh = lp.open("a", buffering=1, encoding="utf-8")
+            _LOG_FH[job_id] = fh
+            if len(_LOG_FH) > MAX_OPEN_LOGS:
+                _LOG_FH.popitem(last=False)[1].close()
+        else:
+            _LOG_FH.move_to_end(job_id)
+        fh.write(line.rstrip()+"\n")
+
+def close_log(job_id: str)->None:
+    """Release the cached log handle; a later append_log reopens it."""
+    with _LOG_LOCK:
+        fh = _LOG_FH.pop(job_id, None)
+    if fh is not None: fh.close()
+
+@atexit.register
+def _close_logs()->None:
+    with _LOG_LOCK:
+        while _LOG_FH:
+            _LOG_FH.popitem()[1].close()
 
 def mark_cancel(job_id: str)->None:
     _job_cancel(job_id).write_text("1", encoding="utf-8")
@@ -2,9 +2,44 @@
 Candidate vetting and quality assessment utilities.
 """
 from __future__ import annotations
+import math
+from bisect import bisect_right
 from typing import Dict, Any, Optional, List
 import numpy as np
 
+# Component score tables: bisect_right(THRESH, x) gives the level, SCORE[level] the score.
+# Level 0 of SDE/SNR is a linear ramp (x * RAMP) rather than a fixed score.
+_SDE_THRESH = (5.0, 7.0, 10.0)
+_SDE_SCORE = (0, 50, 75, 100)
+_SDE_RAMP = 10.0
+_SNR_THRESH = (7.0, 10.0, 15.0)
+_SNR_SCORE = (0, 50, 75, 100)
+_SNR_RAMP = 7.0
+# <=100 ppm shallow, (100, 50000) reasonable, >=50000 possible eclipse
+_DEPTH_THRESH_PPM = (math.nextafter(100.0, math.inf), 50000.0)
+_DEPTH_SCORE = (50, 100, 30)
+# <=0.5 d very short, (0.5, 500) reasonable, >=500 long
+_PERIOD_THRESH = (math.nextafter(0.5, math.inf), 500.0)
+_PERIOD_SCORE = (60, 100, 80)
+_TRANSIT_THRESH = (2, 3, 5)
+_TRANSIT_SCORE = (25, 50, 75, 100)
+_WEIGHTS = {'sde': 0.4, 'snr': 0.2, 'depth': 0.15, 'period': 0.15, 'transit_count': 0.1}
+_GRADE_THRESH = (40.0, 55.0, 70.0, 85.0)
+_GRADES = (
+    ('F', 'very_low', 'POOR CANDIDATE'),
+    ('D', 'low', 'WEAK CANDIDATE'),
+    ('C', 'medium', 'CANDIDATE'),
+    ('B', 'high', 'STRONG CANDIDATE'),
+    ('A', 'very_high', 'HIGH CONFIDENCE CANDIDATE'),
+)
+
+
+def _level(thresh: tuple, x: float) -> int:
+    """Table level for x, or -1 for NaN (which matches no branch)."""
+    if x != x:
+        return -1
+    return bisect_right(thresh, x)
+
 
 def compute_candidate_score(tls_result: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -49,98 +84,66 @@ def compute_candidate_score(tls_result: Dict[str, Any]) -> Dict[str, Any]:
     
     # SDE Score (40% weight) - most important
     if sde is not None:
-        if sde >= 10:
-            score_sde = 100
-        elif sde >= 7:
-            score_sde = 75
-        elif sde >= 5:
-            score_sde = 50
+        lvl = _level(_SDE_THRESH, sde)
+        if lvl > 0:
+            score_sde = _SDE_SCORE[lvl]
         else:
-            score_sde = max(0, sde * 10)
+            score_sde = max(0, sde * _SDE_RAMP)
             flags.append(f"Low SDE ({sde:.1f}σ)")
-        metrics['sde'] = {'value': sde, 'score': score_sde, 'weight': 0.4}
+        metrics['sde'] = {'value': sde, 'score': score_sde, 'weight': _WEIGHTS['sde']}
     
     # SNR Score (20% weight)
     if snr is not None:
-        if snr >= 15:
-            score_snr = 100
-        elif snr >= 10:
-            score_snr = 75
-        elif snr >= 7:
-            score_snr = 50
+        lvl = _level(_SNR_THRESH, snr)
+        if lvl > 0:
+            score_snr = _SNR_SCORE[lvl]
         else:
-            score_snr = max(0, snr * 7)
+            score_snr = max(0, snr * _SNR_RAMP)
             flags.append(f"Low SNR ({snr:.1f})")
-        metrics['snr'] = {'value': snr, 'score': score_snr, 'weight': 0.2}
+        metrics['snr'] = {'value': snr, 'score': score_snr, 'weight': _WEIGHTS['snr']}
     
     # Depth Score (15% weight)
     if depth is not None:
         depth_ppm = depth * 1e6
-        if 100 < depth_ppm < 50000:  # Reasonable transit depths
-            score_depth = 100
-        elif depth_ppm <= 100:
-            score_depth = 50
+        lvl = _level(_DEPTH_THRESH_PPM, depth_ppm)
+        if lvl >= 0:
+            score_depth = _DEPTH_SCORE[lvl]
+        if lvl == 0:
             flags.append(f"Shallow transit ({depth_ppm:.0f} ppm)")
-        elif depth_ppm >= 50000:
-            score_depth = 30
+        elif lvl == 2:
             flags.append(f"Very deep transit ({depth_ppm:.0f} ppm) - possible eclipse")
-        metrics['depth'] = {'value': depth_ppm, 'score': score_depth, 'weight': 0.15}
+        metrics['depth'] = {'value': depth_ppm, 'score': score_depth, 'weight': _WEIGHTS['depth']}
     
-    # Period Score (15% weight)
+    # Period Score (15% weight); long periods are fine, just harder to confirm
     if period is not None:
-        if 0.5 < period < 500:  # Reasonable periods
-            score_period = 100
-        elif period <= 0.5:
-            score_period = 60
+        lvl = _level(_PERIOD_THRESH, period)
+        if lvl >= 0:
+            score_period = _PERIOD_SCORE[lvl]
+        if lvl == 0:
             flags.append(f"Very short period ({period:.2f} d)")
-        elif period >= 500:
-            score_period = 80  # Long periods are fine, just harder to confirm
-        metrics['period'] = {'value': period, 'score': score_period, 'weight': 0.15}
+        metrics['period'] = {'value': period, 'score': score_period, 'weight': _WEIGHTS['period']}
     
     # Transit Count Score (10% weight)
     if transit_count is not None:
-        if transit_count >= 5:
-            score_transits = 100
-        elif transit_count >= 3:
-            score_transits = 75
-        elif transit_count >= 2:
-            score_transits = 50
+        lvl = bisect_right(_TRANSIT_THRESH, transit_count)
+        score_transits = _TRANSIT_SCORE[lvl]
+        if lvl == 1:
             flags.append(f"Only {transit_count} transits observed")
-        else:
-            score_transits = 25
+        elif lvl == 0:
             flags.append(f"Single transit detection")
-        metrics['transit_count'] = {'value': transit_count, 'score': score_transits, 'weight': 0.1}
+        metrics['transit_count'] = {'value': transit_count, 'score': score_transits, 'weight': _WEIGHTS['transit_count']}
     
     # Compute weighted score
     total_score = (
-        score_sde * 0.4 +
-        score_snr * 0.2 +
-        score_depth * 0.15 +
-        score_period * 0.15 +
-        score_transits * 0.1
+        score_sde * _WEIGHTS['sde'] +
+        score_snr * _WEIGHTS['snr'] +
+        score_depth * _WEIGHTS['depth'] +
+        score_period * _WEIGHTS['period'] +
+        score_transits * _WEIGHTS['transit_count']
     )
     
     # Determine grade and confidence
-    if total_score >= 85:
-        grade = 'A'
-        confidence = 'very_high'
-        verdict = 'HIGH CONFIDENCE CANDIDATE'
-    elif total_score >= 70:
-        grade = 'B'
-        confidence = 'high'
-        verdict = 'STRONG CANDIDATE'
-    elif total_score >= 55:
-        grade = 'C'
-        confidence = 'medium'
-        verdict = 'CANDIDATE'
-    elif total_score >= 40:
-        grade = 'D'
-        confidence = 'low'
-        verdict = 'WEAK CANDIDATE'
-    else:
-        grade = 'F'
-        confidence = 'very_low'
-        verdict = 'POOR CANDIDATE'
+    grade, confidence, verdict = _GRADES[bisect_right(_GRADE_THRESH, total_score)]
     
     return {
         'score': round(total_score, 1),
@@ -152,6 +155,85 @@ def compute_candidate_score(tls_result: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def _component_scores(x: np.ndarray, thresh: tuple, scores: tuple, ramp: Optional[float] = None) -> np.ndarray:
+    """Vectorized table lookup; NaN (missing) scores 0 like a missing scalar field."""
+    lvl = np.searchsorted(np.asarray(thresh, dtype=np.float64), x, side='right')
+    out = np.asarray(scores, dtype=np.float64)[lvl]
+    if ramp is not None:
+        low = lvl == 0
+        out[low] = np.maximum(0.0, x[low] * ramp)
+    out[np.isnan(x)] = 0.0
+    return out
+
+
+def _score_batch_arrays(records) -> Dict[str, np.ndarray]:
+    """
+    Array kernel behind compute_candidate_scores_batch, using the same tables as
+    compute_candidate_score.
+    
+    Args:
+        records: record array (or mapping of equal-length arrays) with fields
+            sde, snr, depth, period, n (transit count). NaN marks a missing value.
+    
+    Returns:
+        dict of arrays: score, grade, confidence, verdict. Flags and the per-metric
+        breakdown are only produced by the scalar path.
+    """
+    sde = np.asarray(records['sde'], dtype=np.float64)
+    snr = np.asarray(records['snr'], dtype=np.float64)
+    depth_ppm = np.asarray(records['depth'], dtype=np.float64) * 1e6
+    period = np.asarray(records['period'], dtype=np.float64)
+    ntr = np.trunc(np.asarray(records['n'], dtype=np.float64))
+    
+    total = (
+        _component_scores(sde, _SDE_THRESH, _SDE_SCORE, _SDE_RAMP) * _WEIGHTS['sde'] +
+        _component_scores(snr, _SNR_THRESH, _SNR_SCORE, _SNR_RAMP) * _WEIGHTS['snr'] +
+        _component_scores(depth_ppm, _DEPTH_THRESH_PPM, _DEPTH_SCORE) * _WEIGHTS['depth'] +
+        _component_scores(period, _PERIOD_THRESH, _PERIOD_SCORE) * _WEIGHTS['period'] +
+        _component_scores(ntr, _TRANSIT_THRESH, _TRANSIT_SCORE) * _WEIGHTS['transit_count']
+    )
+    idx = np.searchsorted(np.asarray(_GRADE_THRESH), total, side='right')
+    grades = np.array(_GRADES)
+    return {
+        'score': np.round(total, 1),
+        'grade': grades[idx, 0],
+        'confidence': grades[idx, 1],
+        'verdict': grades[idx, 2],
+    }
+
+
+def compute_candidate_scores_batch(tls_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Score many TLS results in one vectorized pass (bulk vetting / benchmarks).
+    
+    Returns one dict per input with score, grade, confidence and verdict, matching
+    compute_candidate_score; skipped results get the same NO DETECTION entry.
+    """
+    def col(key: str, alt: str, conv) -> np.ndarray:
+        vals = (conv(r.get(key) or r.get(alt)) for r in tls_results)
+        return np.fromiter((np.nan if v is None else v for v in vals), dtype=np.float64, count=len(tls_results))
+    
+    batch = _score_batch_arrays({
+        'sde': col('SDE', 'best_sde', _safe_float),
+        'snr': col('snr', 'best_snr', _safe_float),
+        'depth': col('depth', 'best_depth', _safe_float),
+        'period': col('period', 'best_period', _safe_float),
+        'n': col('transit_count', 'n_transits', _safe_int),
+    })
+    out = []
+    for i, r in enumerate(tls_results):
+        if r.get('skipped'):
+            out.append({'score': 0, 'grade': 'F', 'confidence': 'none', 'verdict': 'NO DETECTION'})
+            continue
+        out.append({
+            'score': float(batch['score'][i]),
+            'grade': str(batch['grade'][i]),
+            'confidence': str(batch['confidence'][i]),
+            'verdict': str(batch['verdict'][i]),
+        })
+    return out
+
+
 def generate_vetting_report(discovery_detail: Dict[str, Any]) -> Dict[str, Any]:
     """
     Generate comprehensive vetting report for a discovery.
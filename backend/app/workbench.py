@@ -1,16 +1,32 @@
 from __future__ import annotations
-import json, math
+import csv, json, math, os, threading, time
+from collections import OrderedDict
+import orjson
 from dataclasses import dataclass
 from typing import List, Tuple, Optional, Dict
 from pathlib import Path
 import numpy as np
-import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 from fastapi import HTTPException
-from .db import list_artifacts_for_star, bulk_index_dir
+from .db import first_artifact_for_star, bulk_index_dir, delete_artifact_path
 from .db import DB_PATH  # for existence check only
 from .db import _guess_kind as _k  # reuse kind guessing
 
 DEFAULT_MAX_POINTS = 20000
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# bump when _downsample output changes so stale sidecars are rebuilt
+SIDECAR_VERSION = 3
+NEG_CACHE_TTL_SEC = 60
+# time-axis jump that counts as a gap (sector boundaries, downlinks)
+GAP_THR_DAYS = 0.5
+NEG_CACHE_MAX = 4096
+
+# (star, kinds) -> monotonic time of the last targeted scan that found nothing, oldest first;
+# stars come from the URL, so the cache is purged on expiry and capped at NEG_CACHE_MAX
+_NEG_CACHE: "OrderedDict[Tuple[str,Tuple[str,...]], float]" = OrderedDict()
+_NEG_LOCK = threading.Lock()
 
 @dataclass
 class Series:
@@ -18,111 +34,255 @@ class Series:
     flux: np.ndarray
     source: Path
 
-def _downsample(x: np.ndarray, y: np.ndarray, max_points:int=DEFAULT_MAX_POINTS)->Tuple[np.ndarray,np.ndarray]:
+def _bin_starts(x: np.ndarray, max_points: int, gap_days: Optional[float])->np.ndarray:
+    """Bin start indices: every step points, restarting at each gap so no bin spans one."""
+    n = len(x)
+    seg = np.r_[0, np.flatnonzero(np.diff(x) > gap_days) + 1] if gap_days is not None else np.zeros(1, np.intp)
+    # each segment may end in a partial bin; reserve one slot per segment to stay within max_points
+    step = math.ceil(n / max(1, max_points - len(seg)))
+    ends = np.r_[seg[1:], n]
+    return np.concatenate([np.arange(a, b, step) for a, b in zip(seg.tolist(), ends.tolist())])
+
+def _bin_mean(a: np.ndarray, starts: np.ndarray)->np.ndarray:
+    ok = ~np.isnan(a)
+    sums = np.add.reduceat(np.where(ok, a, 0.0), starts)
+    cnt = np.add.reduceat(ok.astype(np.intp), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / cnt  # all-NaN bins stay NaN
+
+def _downsample(x: np.ndarray, y: np.ndarray, max_points:int=DEFAULT_MAX_POINTS,
+                gap_days: Optional[float]=None)->Tuple[np.ndarray,np.ndarray]:
+    """Average consecutive points into at most max_points bins (x must be ordered).
+
+    With gap_days, bins never straddle a jump in x larger than gap_days.
+    """
     n = len(x)
     if n <= max_points: return x, y
-    step = math.ceil(n / max_points)
-    return x[::step], y[::step]
+    # bin means are fresh arrays, so the full-size inputs are not kept alive
+    starts = _bin_starts(x, max_points, gap_days)
+    return _bin_mean(x, starts), _bin_mean(y, starts)
 
-def _detect_gaps(t: np.ndarray, thr_days: float=0.5)->List[Tuple[float,float]]:
+def _detect_gaps(t: np.ndarray, thr_days: float=GAP_THR_DAYS)->List[Tuple[float,float]]:
     if len(t) < 2: return []
-    dt = np.diff(t)
-    idx = np.where(dt > thr_days)[0]
-    return [(float(t[i]), float(t[i+1])) for i in idx]
+    idx = np.flatnonzero(np.diff(t) > thr_days)
+    if not idx.size: return []
+    return list(zip(t[idx].tolist(), t[idx+1].tolist()))
+
+def _csv_header(p: Path)->List[str]:
+    with open(p, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+def _alias_map(cols: List[str])->Dict[str,str]:
+    """Lower-cased name -> original column; the first of any case-duplicates wins."""
+    m: Dict[str,str] = {}
+    for c in cols:
+        m.setdefault(c.lower(), c)
+    return m
+
+def _alias(m: Dict[str,str], candidates: Tuple[str,...])->Optional[str]:
+    for k in candidates:
+        if k in m: return m[k]
+    return None
+
+def _read_csv_table(p: Path, cols: List[str])->pa.Table:
+    # Arrow's multi-threaded parser, converting only the requested columns
+    return pacsv.read_csv(p, read_options=pacsv.ReadOptions(use_threads=True),
+                          convert_options=pacsv.ConvertOptions(include_columns=cols, column_types={c: pa.float64() for c in cols}))
+
+def _col(tbl: pa.Table, name: str)->np.ndarray:
+    return tbl.column(name).combine_chunks().to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
 
 def _read_csv_generic(p: Path)->Series:
-    df = pd.read_csv(p)
     # column aliases
-    tcol = next((c for c in df.columns if c.lower() in ("time","t","bjd","btjd")), None)
-    fcol = next((c for c in df.columns if c.lower() in ("flux","f","norm_flux","pdcsap_flux")), None)
+    m = _alias_map(_csv_header(p))
+    tcol = _alias(m, ("time","t","bjd","btjd"))
+    fcol = _alias(m, ("flux","f","norm_flux","pdcsap_flux"))
     if tcol is None or fcol is None:
         raise ValueError("CSV missing time/flux columns")
-    t = df[tcol].to_numpy(dtype=np.float64)
-    f = df[fcol].to_numpy(dtype=np.float64)
+    tbl = _read_csv_table(p, [tcol, fcol])
+    t = _col(tbl, tcol)
+    f = _col(tbl, fcol)
     return Series(t, f, p)
 
+def _load_json(p: Path):
+    b = p.read_bytes()
+    try:
+        return orjson.loads(b)
+    except orjson.JSONDecodeError:
+        # stdlib accepts the NaN/Infinity literals json.dumps emits for float arrays
+        return json.loads(b)
+
 def _read_json_series(p: Path, key_time="time", key_flux="flux")->Series:
-    obj = json.loads(p.read_text(encoding="utf-8"))
+    obj = _load_json(p)
     if key_time not in obj or key_flux not in obj:
         raise ValueError("JSON missing time/flux keys")
     t = np.asarray(obj[key_time], dtype=np.float64)
     f = np.asarray(obj[key_flux], dtype=np.float64)
     return Series(t, f, p)
 
+def _ws_cache_path(src: Path, n: int)->Path:
+    # keep the source suffix so X-lc.csv and X-lc.json never share a sidecar
+    return src.with_name(src.name + f".ds{n}.parquet")
+
+def _read_sidecar(src: Path, n: int)->Optional[Tuple[np.ndarray,np.ndarray,int,list]]:
+    """Downsampled (t, f, n_original, raw gaps) from the parquet sidecar if it was built from src as it is now."""
+    cache = _ws_cache_path(src, n)
+    try:
+        st = src.stat()
+        tbl = pq.read_table(cache)
+        meta = tbl.schema.metadata or {}
+        if meta.get(b"version") != str(SIDECAR_VERSION).encode(): return None
+        # exact stamp match: mtime ordering misses same-tick rewrites and mtime-preserving restores
+        if meta.get(b"src_stamp") != _src_stamp(st): return None
+        gaps = [tuple(g) for g in json.loads(meta[b"gaps"])]
+        return _col(tbl, "t"), _col(tbl, "f"), int(meta[b"n"]), gaps
+    except (OSError, KeyError, ValueError, pa.ArrowException):
+        return None
+
+def _src_stamp(st: os.stat_result)->bytes:
+    return f"{st.st_mtime_ns}:{st.st_size}".encode()
+
+def _write_sidecar(src: Path, n: int, t: np.ndarray, f: np.ndarray, n_orig: int, gaps: list, st: os.stat_result)->None:
+    meta = {"n": str(n_orig), "gaps": json.dumps(gaps), "src_stamp": _src_stamp(st), "version": str(SIDECAR_VERSION)}
+    tbl = pa.Table.from_pydict({"t": t, "f": f}).replace_schema_metadata(meta)
+    cache = _ws_cache_path(src, n)
+    tmp = cache.with_name(cache.name + ".tmp")
+    try:
+        pq.write_table(tbl, tmp)
+        os.replace(tmp, cache)
+    except OSError:
+        pass  # read-only artifact trees just go uncached
+
 def _targeted_scan(root: Path, star: str)->int:
-    """One-time targeted scan of standard roots for a specific star, then persist to DB."""
-    roots = [root/"long_period", root/"search", root/"dossiers", root/"vetting", root/"centroid", root/"stage2"/"series", root]
+    """One-time targeted scan of standard roots for a specific star, then persist to DB.
+
+    Cold-start fallback: while the server runs, artifact_watch indexes new files as they land.
+    """
+    roots = [root/"long_period", root/"search", root/"dossiers", root/"vetting", root/"centroid", root/"stage2"/"series"]
     cnt=0
     for base in roots:
         if base.exists():
             cnt += bulk_index_dir(run_id="adhoc-scan", root=base, star_hint=star.upper())
+    # root last, pruning the sub-roots above so no file is visited twice
+    cnt += bulk_index_dir(run_id="adhoc-scan", root=root, star_hint=star.upper(), exclude=roots)
     return cnt
 
-def get_raw_lightcurve(artifacts_root: Path, star: str)->Dict:
-    # Use index first
-    idx = list_artifacts_for_star(star)
-    cand_path = None
-    for row in idx:
-        if row["kind"]=="lc_raw":
-            cand_path = Path(row["path"]); break
-    if not cand_path:
-        # targeted scan then reload index
-        _targeted_scan(artifacts_root, star)
-        idx = list_artifacts_for_star(star)
-        for row in idx:
-            if row["kind"]=="lc_raw":
-                cand_path = Path(row["path"]); break
+def invalidate_negative_cache(star: Optional[str]=None):
+    """Forget recent misses for star (or all stars), e.g. once new artifacts land."""
+    with _NEG_LOCK:
+        if star is None:
+            _NEG_CACHE.clear(); return
+        star = star.upper()
+        for k in [k for k in _NEG_CACHE if k[0]==star]:
+            del _NEG_CACHE[k]
+
+def _record_miss(key: Tuple[str,Tuple[str,...]])->None:
+    now = time.monotonic()
+    with _NEG_LOCK:
+        _NEG_CACHE[key] = now
+        _NEG_CACHE.move_to_end(key)
+        # entries are in miss order, so expired ones sit at the front
+        while _NEG_CACHE:
+            k, t = next(iter(_NEG_CACHE.items()))
+            if now - t < NEG_CACHE_TTL_SEC and len(_NEG_CACHE) <= NEG_CACHE_MAX: break
+            del _NEG_CACHE[k]
+
+def _first_of(star: str, kinds: Tuple[str,...])->Optional[Path]:
+    row = first_artifact_for_star(star, kinds)
+    # rows for files removed behind the watcher's back are dropped and the next candidate tried
+    while row and not os.path.exists(row["path"]):
+        delete_artifact_path(row["path"])
+        row = first_artifact_for_star(star, kinds)
+    return Path(row["path"]) if row else None
+
+def _find_artifact(artifacts_root: Path, star: str, kinds: Tuple[str,...])->Optional[Path]:
+    """Index lookup, falling back to a targeted scan unless one recently came up empty."""
+    p = _first_of(star, kinds)
+    if p: return p
+    key = (star.upper(), kinds)
+    with _NEG_LOCK:
+        missed = _NEG_CACHE.get(key)
+    if missed is not None and time.monotonic() - missed < NEG_CACHE_TTL_SEC:
+        return None
+    _targeted_scan(artifacts_root, star)
+    p = _first_of(star, kinds)
+    if p:
+        with _NEG_LOCK: _NEG_CACHE.pop(key, None)
+    else: _record_miss(key)
+    return p
+
+def _arrow_ipc(cols: Dict[str,np.ndarray], meta: Dict)->bytes:
+    """Serialize columns as one Arrow IPC stream batch; meta values are JSON-encoded into the schema."""
+    batch = pa.RecordBatch.from_arrays([pa.array(v) for v in cols.values()], names=list(cols))
+    batch = batch.replace_schema_metadata({k: json.dumps(v) for k,v in meta.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as w:
+        w.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+def _raw_lightcurve(artifacts_root: Path, star: str)->Tuple[np.ndarray,np.ndarray,int,list,Path]:
+    cand_path = _find_artifact(artifacts_root, star, ("lc_raw",))
     if not cand_path:
         raise HTTPException(404, f"No light curve found for {star}; run search/multi-sector first.")
-    series: Series
-    try:
-        if cand_path.suffix.lower()==".csv":
-            series = _read_csv_generic(cand_path)
-        elif cand_path.suffix.lower()==".json":
-            # dossiers data json often embeds arrays
-            series = _read_json_series(cand_path, key_time="time", key_flux="flux")
-        else:
-            raise ValueError("Unsupported file type")
-    except Exception as e:
-        raise HTTPException(422, f"Failed to parse LC file {cand_path}: {e}")
-    t, f = _downsample(series.time, series.flux)
-    gaps = _detect_gaps(t)
+    cached = _read_sidecar(cand_path, DEFAULT_MAX_POINTS)
+    if cached:
+        t, f, n, gaps = cached
+    else:
+        series: Series
+        try:
+            # stamped before parsing, so a rewrite during the read invalidates the sidecar
+            st = cand_path.stat()
+            if cand_path.suffix.lower()==".csv":
+                series = _read_csv_generic(cand_path)
+            elif cand_path.suffix.lower()==".json":
+                # dossiers data json often embeds arrays
+                series = _read_json_series(cand_path, key_time="time", key_flux="flux")
+            else:
+                raise ValueError("Unsupported file type")
+        except Exception as e:
+            raise HTTPException(422, f"Failed to parse LC file {cand_path}: {e}")
+        # gaps come from the raw cadence; bin means would shift their edges
+        gaps = _detect_gaps(series.time)
+        t, f = _downsample(series.time, series.flux, gap_days=GAP_THR_DAYS)
+        n = int(len(series.time))
+        # series already within max_points are served as-is; a sidecar would just duplicate them
+        if n > DEFAULT_MAX_POINTS:
+            _write_sidecar(cand_path, DEFAULT_MAX_POINTS, t, f, n, gaps, st)
+    return t, f, n, gaps, cand_path
+
+def get_raw_lightcurve(artifacts_root: Path, star: str)->Dict:
+    t, f, n, gaps, src = _raw_lightcurve(artifacts_root, star)
     return {
-        "star": star, "n": int(len(series.time)),
+        "star": star, "n": n,
         "time": t.tolist(), "flux": f.tolist(),
-        "gaps": gaps, "source": str(series.source),
+        "gaps": gaps, "source": str(src),
     }
 
+def get_raw_lightcurve_arrow(artifacts_root: Path, star: str)->bytes:
+    # time stays float64: float32 cannot resolve 2-min cadence at BTJD/BJD magnitudes
+    t, f, n, gaps, src = _raw_lightcurve(artifacts_root, star)
+    return _arrow_ipc({"time": t, "flux": f.astype(np.float32)},
+                      {"star": star, "n": n, "gaps": gaps, "source": str(src)})
+
 def get_phase_curve(artifacts_root: Path, star: str)->Dict:
-    # Index lookup
-    idx = list_artifacts_for_star(star)
-    p_phase = None
     # prefer explicit phase, else fit/tls_result
-    for pref in ("phase","fit","tls_result"):
-        row = next((r for r in idx if r["kind"]==pref), None)
-        if row:
-            p_phase = Path(row["path"]); break
-    if not p_phase:
-        _targeted_scan(artifacts_root, star)
-        idx = list_artifacts_for_star(star)
-        for pref in ("phase","fit","tls_result"):
-            row = next((r for r in idx if r["kind"]==pref), None)
-            if row:
-                p_phase = Path(row["path"]); break
+    p_phase = _find_artifact(artifacts_root, star, ("phase","fit","tls_result"))
     if not p_phase:
         raise HTTPException(404, f"No phase/fold data found for {star}; ensure search-fit artifacts exist.")
     model = None; period=None; t0=None; dur=None
     try:
         if p_phase.suffix.lower()==".csv":
-            df = pd.read_csv(p_phase)
+            header = _csv_header(p_phase)
+            m = _alias_map(header)
             # expect columns: phase, flux [, model]
-            phcol = next((c for c in df.columns if c.lower() in ("phase","phi")), None)
-            fxcol = next((c for c in df.columns if c.lower() in ("flux","f","norm_flux")), None)
+            phcol = _alias(m, ("phase","phi"))
+            fxcol = _alias(m, ("flux","f","norm_flux"))
             if phcol is None or fxcol is None: raise ValueError("CSV missing phase/flux")
-            phase = df[phcol].to_numpy(np.float64); flux = df[fxcol].to_numpy(np.float64)
-            if "model" in df.columns: model = df["model"].to_numpy(np.float64)
+            tbl = _read_csv_table(p_phase, [phcol, fxcol] + (["model"] if "model" in header else []))
+            phase = _col(tbl, phcol); flux = _col(tbl, fxcol)
+            if "model" in header: model = _col(tbl, "model")
         else:
-            obj = json.loads(p_phase.read_text(encoding="utf-8"))
+            obj = _load_json(p_phase)
             # Accept different shapes
             if "phase" in obj and "flux" in obj:
                 phase = np.asarray(obj["phase"], np.float64); flux = np.asarray(obj["flux"], np.float64)
@@ -135,11 +295,17 @@ def get_phase_curve(artifacts_root: Path, star: str)->Dict:
             period = obj.get("period") or obj.get("P_days") or (obj.get("best") or {}).get("period")
             t0 = obj.get("t0") or (obj.get("best") or {}).get("t0")
             dur = obj.get("duration") or (obj.get("best") or {}).get("duration")
-        phase, flux = _downsample(phase, flux)
+        has_model = model is not None and len(model)==len(phase)
+        if len(phase)>1 and np.any(np.diff(phase) < 0):
+            # bin means need phase-ordered samples
+            order = np.argsort(phase, kind="stable")
+            phase = phase[order]; flux = flux[order]
+            if has_model: model = model[order]
         model_list = None
         if model is not None and len(model)>0:
-            _, model = _downsample(phase, model)
+            if has_model: _, model = _downsample(phase, model)
             model_list = model.tolist()
+        phase, flux = _downsample(phase, flux)
         return {
             "star": star, "phase": phase.tolist(), "flux": flux.tolist(),
             "model": model_list, "period": period, "t0": t0, "duration": dur, "source": str(p_phase)
@@ -148,18 +314,11 @@ def get_phase_curve(artifacts_root: Path, star: str)->Dict:
         raise HTTPException(422, f"Failed to parse phase data: {e}")
 
 def get_oddeven(artifacts_root: Path, star: str)->Dict:
-    idx = list_artifacts_for_star(star)
-    row = next((r for r in idx if r["kind"]=="odd_even"), None)
-    p = Path(row["path"]) if row else None
-    if not p:
-        _targeted_scan(artifacts_root, star)
-        idx = list_artifacts_for_star(star)
-        row = next((r for r in idx if r["kind"]=="odd_even"), None)
-        p = Path(row["path"]) if row else None
+    p = _find_artifact(artifacts_root, star, ("odd_even",))
     if not p:
         raise HTTPException(404, f"No odd/even comparison found for {star}; run vetting.")
     try:
-        obj = json.loads(p.read_text(encoding="utf-8"))
+        obj = _load_json(p)
         odd = obj.get("odd") or {}
         even = obj.get("even") or {}
         ret = {
@@ -171,36 +330,41 @@ def get_oddeven(artifacts_root: Path, star: str)->Dict:
     except Exception as e:
         raise HTTPException(422, f"Failed to parse odd/even JSON: {e}")
 
-def get_centroid(artifacts_root: Path, star: str)->Dict:
-    idx = list_artifacts_for_star(star)
-    row = next((r for r in idx if r["kind"]=="centroid"), None)
-    p = Path(row["path"]) if row else None
-    if not p:
-        _targeted_scan(artifacts_root, star)
-        idx = list_artifacts_for_star(star)
-        row = next((r for r in idx if r["kind"]=="centroid"), None)
-        p = Path(row["path"]) if row else None
+def _centroid_arrays(artifacts_root: Path, star: str)->Tuple[np.ndarray,np.ndarray,np.ndarray,Path]:
+    p = _find_artifact(artifacts_root, star, ("centroid",))
     if not p:
         raise HTTPException(404, f"No centroid series found for {star}; enable centroid export in vetting.")
     try:
         if p.suffix.lower()==".csv":
-            df = pd.read_csv(p)
-            tcol = next((c for c in df.columns if c.lower() in ("time","t","bjd","btjd")), None)
-            dxcol = next((c for c in df.columns if "dx" in c.lower() or "col" in c.lower()), None)
-            dycol = next((c for c in df.columns if "dy" in c.lower() or "row" in c.lower()), None)
+            header = _csv_header(p)
+            m = _alias_map(header)
+            tcol = _alias(m, ("time","t","bjd","btjd"))
+            dxcol = next((c for c in header if "dx" in c.lower() or "col" in c.lower()), None)
+            dycol = next((c for c in header if "dy" in c.lower() or "row" in c.lower()), None)
             if tcol is None or dxcol is None or dycol is None:
                 raise ValueError("CSV missing time/dx/dy")
-            t = df[tcol].to_numpy(np.float64)
-            dx = df[dxcol].to_numpy(np.float64)
-            dy = df[dycol].to_numpy(np.float64)
+            tbl = _read_csv_table(p, [tcol, dxcol, dycol])
+            t = _col(tbl, tcol)
+            dx = _col(tbl, dxcol)
+            dy = _col(tbl, dycol)
         else:
-            obj = json.loads(p.read_text(encoding="utf-8"))
+            obj = _load_json(p)
             t = np.asarray(obj.get("time"), np.float64)
             dx = np.asarray(obj.get("dx") or obj.get("x") or obj.get("col"), np.float64)
             dy = np.asarray(obj.get("dy") or obj.get("y") or obj.get("row"), np.float64)
-        t, dx = _downsample(t, dx)
-        _, dy = _downsample(t, dy)
-        r = np.sqrt(dx*dx + dy*dy)
-        return {"star": star, "time": t.tolist(), "dx": dx.tolist(), "dy": dy.tolist(), "r": r.tolist(), "source": str(p)}
+        _, dy = _downsample(t, dy, gap_days=GAP_THR_DAYS)
+        t, dx = _downsample(t, dx, gap_days=GAP_THR_DAYS)
+        return t, dx, dy, p
     except Exception as e:
         raise HTTPException(422, f"Failed to parse centroid series: {e}")
+
+def get_centroid(artifacts_root: Path, star: str)->Dict:
+    t, dx, dy, p = _centroid_arrays(artifacts_root, star)
+    r = np.sqrt(dx*dx + dy*dy)
+    return {"star": star, "time": t.tolist(), "dx": dx.tolist(), "dy": dy.tolist(), "r": r.tolist(), "source": str(p)}
+
+def get_centroid_arrow(artifacts_root: Path, star: str)->bytes:
+    t, dx, dy, p = _centroid_arrays(artifacts_root, star)
+    dx = dx.astype(np.float32); dy = dy.astype(np.float32)
+    r = np.sqrt(dx*dx + dy*dy)
+    return _arrow_ipc({"time": t, "dx": dx, "dy": dy, "r": r}, {"star": star, "source": str(p)})